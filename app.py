@@ -1,10 +1,12 @@
 from app import create_app, db
 from app.models import Usuario, Devices, Sync, Log
+from app.shards import log_shards
 import os
 
 app = create_app()
 with app.app_context():
     db.create_all()
+    log_shards.create_all()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -28,12 +28,23 @@ def create_app():
     migrate.init_app(app, db)
     limiter.init_app(app)
 
+    from app.shards import log_shards
+    log_shards.init_app(app)
+
     # Proxy Cloudflare
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
     # Register routes
-    from app.routes import current, legacy
+    from app.routes import current, legacy, admin
     app.register_blueprint(current.bp)
     app.register_blueprint(legacy.bp)
+    app.register_blueprint(admin.bp)
+
+    # Comandos CLI
+    from app.recalibration import recalibrate_command
+    app.cli.add_command(recalibrate_command)
+    from app.shards import shard_logs_command, shard_upgrade_command
+    app.cli.add_command(shard_logs_command)
+    app.cli.add_command(shard_upgrade_command)
 
     return app
\ No newline at end of file
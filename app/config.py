@@ -8,4 +8,18 @@ class Config:
         'DATABASE_URL',
         f'sqlite:///{join(basedir, "app.db")}'
     )
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # Sharding de logs por hash de device_id (0 = todos los logs en la base principal)
+    LOG_SHARDS = int(os.environ.get('LOG_SHARDS', 0))
+    LOG_SHARD_URI = os.environ.get(
+        'LOG_SHARD_URI',
+        f'sqlite:///{join(basedir, "logs_shard_{}.db")}'
+    )
+
+    # Estadisticas y alertas por dispositivo
+    STATS_EWMA_MINUTES = float(os.environ.get('STATS_EWMA_MINUTES', 30))
+    ALERT_MOISTURE_THRESHOLD = float(os.environ.get('ALERT_MOISTURE_THRESHOLD', 30))
+    ALERT_MOISTURE_MINUTES = float(os.environ.get('ALERT_MOISTURE_MINUTES', 120))
+    ALERT_TEMP_SPIKE_DELTA = float(os.environ.get('ALERT_TEMP_SPIKE_DELTA', 8))
\ No newline at end of file
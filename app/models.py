@@ -1,12 +1,24 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
+from zoneinfo import ZoneInfo
 import time
+from sqlalchemy import event
 from app import db
 
+PACIFIC = ZoneInfo('America/Los_Angeles')
+
 def get_pacific_time():
-    utc_now = datetime.now(timezone.utc)
-    is_dst = time.localtime().tm_isdst > 0
-    offset = timedelta(hours=7 if is_dst else 8)
-    return (utc_now - offset).replace(tzinfo=None)
+    # La zona IANA resuelve el DST por fecha, sin depender del horario local del servidor
+    return datetime.now(PACIFIC).replace(tzinfo=None)
+
+def get_epoch_ms():
+    return time.time_ns() // 1_000_000
+
+def pacific_to_epoch_ms(naive_dt):
+    # Convierte un datetime naive en hora del Pacifico a epoch UTC en ms
+    return int(naive_dt.replace(tzinfo=PACIFIC).timestamp() * 1000)
+
+def epoch_ms_to_pacific(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, PACIFIC).replace(tzinfo=None)
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -20,7 +32,8 @@ class Devices(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     udid = db.Column(db.String(128), unique=True, nullable=False)
     syncs = db.relationship('Sync', back_populates='dispositivo', cascade='all, delete-orphan')
-    logs = db.relationship('Log', back_populates='device', cascade='all, delete-orphan')
+    # Sin relacion con Log: con LOG_SHARDS > 0 los logs no estan en esta base.
+    # Usar app.utils.device_logs(device_id)
 
 class Sync(db.Model):
     __tablename__ = 'sync'
@@ -41,5 +54,59 @@ class Log(db.Model):
     raw_calMin = db.Column(db.Float, nullable=True)
     raw_calMax = db.Column(db.Float, nullable=True)
     soil_type = db.Column(db.Integer, nullable=True)
-    created_at = db.Column(db.DateTime, default=get_pacific_time, index=True)
-    device = db.relationship('Devices', back_populates='logs')
\ No newline at end of file
+    # Curva efectiva aplicada por una recalibracion (NULL = curva base del firmware)
+    gamma = db.Column(db.Float, nullable=True)
+    # Ambos se completan en _log_timestamps a partir de una sola lectura del reloj
+    created_at = db.Column(db.DateTime, index=True)
+    created_at_ms = db.Column(db.BigInteger, index=True)
+
+    __table_args__ = (
+        db.Index('ix_logs_device_id_created_at_ms', 'device_id', 'created_at_ms'),
+    )
+
+@event.listens_for(Log, 'before_insert')
+def _log_timestamps(mapper, connection, target):
+    if target.created_at_ms is None:
+        target.created_at_ms = get_epoch_ms()
+    if target.created_at is None:
+        target.created_at = epoch_ms_to_pacific(target.created_at_ms)
+
+class RecalibrationJob(db.Model):
+    __tablename__ = 'recalibration_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=True)
+    soil_type = db.Column(db.Integer, nullable=True)
+    cal_min = db.Column(db.Float, nullable=True)
+    cal_max = db.Column(db.Float, nullable=True)
+    gamma = db.Column(db.Float, nullable=True)
+    shard = db.Column(db.Integer, nullable=False, default=0)
+    last_log_id = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    created_at_ms = db.Column(db.BigInteger, default=get_epoch_ms)
+    updated_at_ms = db.Column(db.BigInteger, default=get_epoch_ms, onupdate=get_epoch_ms)
+    device = db.relationship('Devices')
+
+class DeviceStats(db.Model):
+    __tablename__ = 'device_stats'
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), primary_key=True)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    last_ms = db.Column(db.BigInteger, nullable=True)
+    ewma_moisture = db.Column(db.Float, nullable=True)
+    ewma_temp = db.Column(db.Float, nullable=True)
+    buckets = db.Column(db.Text, nullable=True)
+    below_since_ms = db.Column(db.BigInteger, nullable=True)
+    dry_alerted = db.Column(db.Boolean, nullable=False, default=False)
+    spike_alerted = db.Column(db.Boolean, nullable=False, default=False)
+
+class Alert(db.Model):
+    __tablename__ = 'alerts'
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
+    rule = db.Column(db.String(32), nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    created_at_ms = db.Column(db.BigInteger, default=get_epoch_ms, index=True)
+
+    __table_args__ = (
+        db.Index('ix_alerts_device_id_created_at_ms', 'device_id', 'created_at_ms'),
+    )
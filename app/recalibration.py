@@ -0,0 +1,202 @@
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+from app import db
+from app.models import Log, Devices, RecalibrationJob
+from app.shards import log_shards
+
+DEFAULT_CHUNK_SIZE = 10000
+MAX_CHUNK_SIZE = 50000
+DEFAULT_MAX_CHUNKS = 10
+MAX_CHUNKS_PER_REQUEST = 100
+
+# Verificacion de la curva contra los valores que envio el firmware
+CHECK_SAMPLE_SIZE = 500
+CHECK_TOLERANCE = 5.0
+
+def compute_moisture(raw, cal_min, cal_max, gamma=1.0):
+    # Sensor capacitivo: cal_max = seco (aire), cal_min = saturado (agua).
+    # gamma ajusta la curvatura (1.0 = lineal)
+    span = cal_max - cal_min
+    valid = span > 0
+    safe_span = np.where(valid, span, 1.0)
+    ratio = np.clip((cal_max - raw) / safe_span, 0.0, 1.0)
+
+    moisture = np.power(ratio, gamma) * 100.0
+    return np.where(valid, moisture, np.nan)
+
+def _filter_logs(query, device_id, soil_type):
+    if device_id is not None:
+        query = query.where(Log.device_id == device_id)
+    if soil_type is not None:
+        query = query.where(Log.soil_type == soil_type)
+    return query
+
+def _row_gamma(gamma):
+    # Logs sin gamma conservan la curva base del firmware (lineal)
+    return np.where(np.isnan(gamma), 1.0, gamma)
+
+def curve_error(device_id, soil_type):
+    # Verifica la formula base: cada log con su calibracion y curva actuales (antes del
+    # cambio) debe reproducir el moisture_dirt guardado. No mide el cambio solicitado.
+    sessions = [log_shards.session_for(device_id)] if device_id is not None else log_shards.all_sessions()
+    rows = []
+    for session in sessions:
+        query = select(Log.raw_soil, Log.raw_calMin, Log.raw_calMax, Log.gamma, Log.moisture_dirt).where(
+            Log.raw_soil.isnot(None), Log.raw_calMin.isnot(None), Log.raw_calMax.isnot(None)
+        )
+        query = _filter_logs(query, device_id, soil_type).order_by(Log.id.desc()).limit(CHECK_SAMPLE_SIZE - len(rows))
+        rows.extend(session.execute(query).all())
+        if len(rows) >= CHECK_SAMPLE_SIZE:
+            break
+
+    if not rows:
+        return None
+
+    raw, cal_min, cal_max, gamma, stored = np.array(rows, dtype=np.float64).T
+    moisture = compute_moisture(raw, cal_min, cal_max, _row_gamma(gamma))
+    valid = np.isfinite(moisture)
+    if not valid.any():
+        return None
+    return float(np.median(np.abs(moisture[valid] - stored[valid])))
+
+def create_job(udid=None, soil_type=None, cal_min=None, cal_max=None, gamma=None, force=False):
+    if udid is None and soil_type is None:
+        raise ValueError('Se requiere udid o soil_type')
+    if cal_min is None and cal_max is None and gamma is None:
+        raise ValueError('El job no cambia la calibracion: se requiere cal_min, cal_max o gamma')
+    if gamma is not None and gamma <= 0:
+        raise ValueError('gamma debe ser mayor a 0')
+
+    device_id = None
+    if udid is not None:
+        dispositivo = Devices.query.filter_by(udid=udid).first()
+        if not dispositivo:
+            raise ValueError('Dispositivo no encontrado')
+        device_id = dispositivo.id
+
+    # gamma None = cada log conserva su curva efectiva (logs.gamma); solo cambia min/max
+    if not force:
+        error = curve_error(device_id, soil_type)
+        if error is not None and error > CHECK_TOLERANCE:
+            raise ValueError(
+                f'La formula base no reproduce los valores guardados (error mediano {error:.1f}); '
+                'revisar la calibracion del firmware o usar force'
+            )
+
+    # Un job por dispositivo solo recorre su shard; uno por tipo de suelo recorre todos desde el 0
+    shard = log_shards.shard_for(device_id) if device_id is not None else 0
+    job = RecalibrationJob(device_id=device_id, soil_type=soil_type, cal_min=cal_min, cal_max=cal_max,
+                           gamma=gamma, shard=shard)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def _chunk_query(job, chunk_size):
+    query = select(
+        Log.id, Log.raw_soil, Log.raw_calMin, Log.raw_calMax, Log.gamma
+    ).where(Log.id > job.last_log_id, Log.raw_soil.isnot(None))
+
+    return _filter_logs(query, job.device_id, job.soil_type).order_by(Log.id).limit(chunk_size)
+
+def _recalibrate_chunk(session, job, rows):
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    # None -> NaN al convertir a float64
+    raw, cal_min, cal_max, gamma = np.array(
+        [(row.raw_soil, row.raw_calMin, row.raw_calMax, row.gamma) for row in rows],
+        dtype=np.float64
+    ).T
+
+    if job.cal_min is not None:
+        cal_min = np.full_like(raw, job.cal_min)
+    if job.cal_max is not None:
+        cal_max = np.full_like(raw, job.cal_max)
+    # Sin gamma en el job se reutiliza la curva efectiva de cada log
+    gamma = np.full_like(raw, job.gamma) if job.gamma is not None else _row_gamma(gamma)
+
+    moisture = compute_moisture(raw, cal_min, cal_max, gamma)
+    valid = np.isfinite(moisture)
+
+    params = []
+    for log_id, value, minimo, maximo in zip(ids[valid].tolist(), moisture[valid].tolist(),
+                                             cal_min[valid].tolist(), cal_max[valid].tolist()):
+        fila = {'id': log_id, 'moisture_dirt': value}
+        if job.gamma is not None:
+            fila['gamma'] = job.gamma
+        if job.cal_min is not None:
+            fila['raw_calMin'] = minimo
+        if job.cal_max is not None:
+            fila['raw_calMax'] = maximo
+        params.append(fila)
+
+    if params:
+        session.execute(update(Log), params)
+    return len(params)
+
+def run_job(job, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=None):
+    # Cada chunk se confirma y luego su checkpoint (shard, last_log_id); repetir un
+    # chunk tras una interrupcion es inocuo porque el calculo es deterministico
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f'chunk_size debe estar entre 1 y {MAX_CHUNK_SIZE}')
+    if job.status == 'done':
+        return job
+
+    job.status = 'running'
+    db.session.commit()
+
+    chunks = 0
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            session = log_shards.session(job.shard)
+            rows = session.execute(_chunk_query(job, chunk_size)).all()
+            if not rows:
+                if job.device_id is not None or job.shard + 1 >= len(log_shards.indexes()):
+                    job.status = 'done'
+                    break
+                job.shard += 1
+                job.last_log_id = 0
+                db.session.commit()
+                continue
+
+            job.processed += _recalibrate_chunk(session, job, rows)
+            job.last_log_id = rows[-1].id
+            session.commit()
+            db.session.commit()
+            chunks += 1
+
+        db.session.commit()
+    except Exception:
+        log_shards.rollback()
+        db.session.rollback()
+        job.status = 'failed'
+        db.session.commit()
+        raise
+
+    return job
+
+@click.command('recalibrate')
+@click.option('--udid', default=None, help='Recalibrar los logs de un dispositivo')
+@click.option('--soil-type', type=int, default=None, help='Recalibrar los logs de un tipo de suelo')
+@click.option('--cal-min', type=float, default=None, help='Nuevo raw_calMin del sensor')
+@click.option('--cal-max', type=float, default=None, help='Nuevo raw_calMax del sensor')
+@click.option('--gamma', type=float, default=None, help='Nueva curvatura (1.0 = lineal); sin ella se conserva la de cada log')
+@click.option('--force', is_flag=True, help='Aplicar aunque la formula base no reproduzca los valores guardados')
+@click.option('--chunk-size', type=click.IntRange(1, MAX_CHUNK_SIZE), default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option('--resume', 'job_id', type=int, default=None, help='Reanudar un job existente')
+@with_appcontext
+def recalibrate_command(udid, soil_type, cal_min, cal_max, gamma, force, chunk_size, job_id):
+    """Recalcula moisture_dirt a partir de las lecturas raw guardadas."""
+    if job_id is not None:
+        job = db.session.get(RecalibrationJob, job_id)
+        if not job:
+            raise click.ClickException('Job no encontrado')
+    else:
+        try:
+            job = create_job(udid, soil_type, cal_min, cal_max, gamma, force)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    click.echo(f'Job {job.id}: reanudando desde shard {job.shard}, log {job.last_log_id}')
+    run_job(job, chunk_size=chunk_size)
+    click.echo(f'Job {job.id}: {job.status}, {job.processed} logs recalibrados')
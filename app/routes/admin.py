@@ -0,0 +1,67 @@
+import hmac
+from flask import Blueprint, request, jsonify, current_app
+from app import db, limiter
+from app.models import RecalibrationJob
+from app.recalibration import (create_job, run_job, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE,
+                               DEFAULT_MAX_CHUNKS, MAX_CHUNKS_PER_REQUEST)
+from app.utils import jsonifiedjob
+
+bp = Blueprint('admin', __name__)
+mild = "10 per minute"
+medium = "5 per minute"
+strict = "2 per minute"
+
+@bp.before_request
+def require_admin_token():
+    token = current_app.config.get('ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    if not token or not hmac.compare_digest(provided, token):
+        return jsonify({'error': 'No autorizado'}), 403
+
+@bp.route('/admin/recalibrate', methods=['POST'])
+@limiter.limit(medium)
+def recalibrate():
+    # Payload: {"udid": "ESP32-123", "cal_min": 1800, "cal_max": 3200, "max_chunks": 10}
+    #      o:  {"soil_type": 1, "gamma": 1.4} / {"job_id": 3} para reanudar
+    data = request.get_json() or {}
+
+    try:
+        chunk_size = int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        max_chunks = int(data.get('max_chunks', DEFAULT_MAX_CHUNKS))
+        if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f'chunk_size debe estar entre 1 y {MAX_CHUNK_SIZE}')
+        if not 1 <= max_chunks <= MAX_CHUNKS_PER_REQUEST:
+            raise ValueError(f'max_chunks debe estar entre 1 y {MAX_CHUNKS_PER_REQUEST}')
+
+        if 'job_id' in data:
+            job = db.session.get(RecalibrationJob, int(data['job_id']))
+            if not job:
+                return jsonify({'error': 'Job no encontrado'}), 404
+        else:
+            job = create_job(
+                udid=data.get('udid'),
+                soil_type=int(data['soil_type']) if data.get('soil_type') is not None else None,
+                cal_min=float(data['cal_min']) if data.get('cal_min') is not None else None,
+                cal_max=float(data['cal_max']) if data.get('cal_max') is not None else None,
+                gamma=float(data['gamma']) if data.get('gamma') is not None else None,
+                force=data.get('force') is True
+            )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Se procesan como mucho max_chunks por peticion; el job se reanuda con job_id
+        run_job(job, chunk_size=chunk_size, max_chunks=max_chunks)
+    except Exception as e:
+        return jsonify({'error': str(e), 'job_id': job.id}), 500
+
+    return jsonifiedjob(job), (200 if job.status == 'done' else 202)
+
+@bp.route('/admin/recalibrate/<int:job_id>', methods=['GET'])
+@limiter.limit(mild)
+def recalibrate_status(job_id):
+    job = db.session.get(RecalibrationJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job no encontrado'}), 404
+
+    return jsonifiedjob(job)
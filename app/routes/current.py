@@ -1,14 +1,15 @@
 from flask import Blueprint, request, jsonify, redirect
-from sqlalchemy import func
 from app import db, limiter
-from app.models import Usuario, Devices, Sync, Log
-from app.utils import jsonifiedlog
-from datetime import datetime
+from app.models import Usuario, Devices, Sync, Log, Alert, get_epoch_ms
+from app.stats import get_state, update_device_stats
+from app.shards import log_shards
+from app.utils import jsonifiedlog, jsonifiedstats, parse_since_ms, before_cursor, device_logs, paginate_logs, count_logs_by_device
 
 bp = Blueprint('current', __name__)
 mild = "10 per minute"
 medium = "5 per minute"
 strict = "2 per minute"
+MAX_ALERTS = 100
 
 @bp.before_request
 def enforce_https():
@@ -21,18 +22,19 @@ def enforce_https():
 def show_known():
     try:
         devices = db.session.query(
+            Devices.id,
             Devices.udid,
-            Usuario.email,
-            func.count(Log.id).label('total_logs')
+            Usuario.email
         ).outerjoin(Sync, Sync.device_id == Devices.id
         ).outerjoin(Usuario, Usuario.id == Sync.user_id
-        ).outerjoin(Log, Log.device_id == Devices.id
-        ).group_by(Devices.udid, Usuario.email).all()
+        ).all()
+        # Los logs pueden estar repartidos en shards, se cuentan aparte
+        logs_count = count_logs_by_device()
 
         response = [{
             'udid': device.udid,
             'registered_to': device.email,
-            'logs_count': device.total_logs
+            'logs_count': logs_count.get(device.id, 0)
         } for device in devices]
 
         return jsonify({'devices': response})
@@ -132,6 +134,26 @@ def get_user_devices(email):
 
     return jsonify([d.udid for d in dispositivos])
 
+@bp.route('/iot/<string:udid>/stats', methods=['GET'])
+@limiter.limit(mild)
+def get_device_stats(udid):
+    # Param opcional: ?alerts=# (cantidad de alertas recientes, default 20, max 100)
+    amount = request.args.get('alerts', default=20, type=int)
+
+    if not 1 <= amount <= MAX_ALERTS:
+        return jsonify({'error': f'alerts debe estar entre 1 y {MAX_ALERTS}'}), 400
+
+    dispositivo = Devices.query.filter_by(udid=udid).first()
+    if not dispositivo:
+        return jsonify({'error': 'Dispositivo no encontrado'}), 404
+
+    # Estado y alertas viven en el shard del dispositivo
+    session = log_shards.session_for(dispositivo.id)
+    state = get_state(session, dispositivo.id)
+    alerts = session.query(Alert).filter(Alert.device_id == dispositivo.id).order_by(Alert.created_at_ms.desc()).limit(amount).all()
+
+    return jsonifiedstats(udid, state, alerts)
+
 # Log routes
 @bp.route('/logs/submit', methods=['POST'])
 @limiter.limit(strict)
@@ -148,6 +170,8 @@ def submit_log():
         if not dispositivo:
             return jsonify({'error': 'Dispositivo no encontrado'}), 404
 
+        # Una sola lectura del reloj; created_at se deriva de created_at_ms
+        ahora_ms = get_epoch_ms()
         nuevo_log = Log(
             device_id=dispositivo.id,
             temp=float(data['temp']),
@@ -156,44 +180,57 @@ def submit_log():
             raw_soil=float(data['raw_soil']),
             raw_calMin=float(data['raw_calMin']),
             raw_calMax=float(data['raw_calMax']),
-            soil_type=int(data['soil_type'])
+            soil_type=int(data['soil_type']),
+            created_at_ms=ahora_ms
         )
-        db.session.add(nuevo_log)
-        db.session.commit()
-        return jsonify({'message': 'Datos guardados'}), 201       
+        # Log, estadisticas y alertas van al shard del dispositivo en una sola transaccion
+        log_session = log_shards.session_for(dispositivo.id)
+        log_session.add(nuevo_log)
+        alerts = update_device_stats(log_session, dispositivo.id, nuevo_log.moisture_dirt, nuevo_log.temp, ahora_ms)
+        log_session.commit()
+        return jsonify({'message': 'Datos guardados', 'alerts': [a.rule for a in alerts]}), 201       
     except Exception as e:
+        log_shards.rollback()
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/logs/<string:udid>', methods=['GET'])
 @limiter.limit(mild)
 def get_device_logs(udid):
-    # Param opcional: ?page=# ?page_size=# ?all=true ?since=YYYY-MM-DDTHH:MM:SS
+    # Param opcional: ?page=# ?page_size=# ?all=true ?since=YYYY-MM-DDTHH:MM:SS ?before=<timestamp_ms>&before_id=<id>
     
     page = request.args.get('page', default=1, type=int)
     page_size = request.args.get('page_size', default=10, type=int)
     all_logs = request.args.get('all', default='false', type=str).lower() == 'true'
     since_str = request.args.get('since', type=str)
     latest = request.args.get('latest', type=str)
+    before = request.args.get('before', type=int)
+    before_id = request.args.get('before_id', type=int)
+
+    if page_size <= 0:
+        return jsonify({'error': 'page_size debe ser mayor a 0'}), 400
     dispositivo = Devices.query.filter_by(udid=udid).first()
 
     if not dispositivo:
         return jsonify({'error': 'Dispositivo no encontrado'}), 404
 
     if all_logs:
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).all()
+        logs = device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
     elif since_str:
         try:
             # Parseamos la fecha CON segundos (formato: YYYY-MM-DDTHH:MM:SS)
-            since_datetime = datetime.strptime(since_str, '%Y-%m-%dT%H:%M:%S')
-            # Filtramos registros >= al timestamp proporcionado (ignorando microsegundos en la comparación)
-            logs = Log.query.filter(Log.created_at >= since_datetime).order_by(Log.created_at.desc()).all()
+            since_ms = parse_since_ms(since_str)
+            # Filtramos registros >= al timestamp proporcionado sobre la columna entera indexada
+            logs = device_logs(dispositivo.id).filter(Log.created_at_ms >= since_ms).order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
         except ValueError:
             return jsonify({'error': 'Formato de fecha inválido. Usa YYYY-MM-DDTHH:MM:SS'}), 400
+    elif before is not None:
+        # Cursor: registros anteriores al (timestamp_ms, id) del ultimo elemento recibido
+        logs = device_logs(dispositivo.id).filter(before_cursor(before, before_id)).order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(page_size).all()
     elif latest and latest.lower() == 'true':
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).limit(1).all()
+        logs = device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(1).all()
     else:
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).paginate(page=page, per_page=page_size, error_out=False).items
+        logs = paginate_logs(device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()), page, page_size)
     
 
     return jsonifiedlog(logs)
@@ -201,12 +238,17 @@ def get_device_logs(udid):
 @bp.route('/logs/<string:email>/<string:udid>', methods=['GET'])
 @limiter.limit(mild)
 def get_user_device_logs(email, udid):
-    # Param opcional: ?page=# ?page_size=# ?all=true ?since=YYYY-MM-DDTHH:MM:SS
+    # Param opcional: ?page=# ?page_size=# ?all=true ?since=YYYY-MM-DDTHH:MM:SS ?before=<timestamp_ms>&before_id=<id>
     page = request.args.get('page', default=1, type=int)
     page_size = request.args.get('page_size', default=10, type=int)
     all_logs = request.args.get('all', default='false', type=str).lower() == 'true'
     since_str = request.args.get('since', type=str)
     latest = request.args.get('latest', type=str)
+    before = request.args.get('before', type=int)
+    before_id = request.args.get('before_id', type=int)
+
+    if page_size <= 0:
+        return jsonify({'error': 'page_size debe ser mayor a 0'}), 400
 
     # Validacion de usuario y dispositivo
     usuario = Usuario.query.filter_by(email=email).first()
@@ -226,19 +268,22 @@ def get_user_device_logs(email, udid):
     
     # Consulta de logs
     if all_logs:
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).all()
+        logs = device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
     elif since_str:
         try:
             # Parseamos la fecha CON segundos (formato: YYYY-MM-DDTHH:MM:SS)
-            since_datetime = datetime.strptime(since_str, '%Y-%m-%dT%H:%M:%S')
-            # Filtramos registros >= al timestamp proporcionado (ignorando microsegundos en la comparación)
-            logs = Log.query.filter(Log.created_at >= since_datetime).all()
+            since_ms = parse_since_ms(since_str)
+            # Filtramos registros >= al timestamp proporcionado sobre la columna entera indexada
+            logs = device_logs(dispositivo.id).filter(Log.created_at_ms >= since_ms).order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
         except ValueError:
             return jsonify({'error': 'Formato de fecha inválido. Usa YYYY-MM-DDTHH:MM:SS'}), 400
+    elif before is not None:
+        # Cursor: registros anteriores al (timestamp_ms, id) del ultimo elemento recibido
+        logs = device_logs(dispositivo.id).filter(before_cursor(before, before_id)).order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(page_size).all()
     elif latest and latest.lower() == 'true':
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).limit(1).all()
+        logs = device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(1).all()
     else:
-        logs = Log.query.filter_by(device_id=dispositivo.id).order_by(Log.created_at.desc()).paginate(page=page, per_page=page_size, error_out=False).items
+        logs = paginate_logs(device_logs(dispositivo.id).order_by(Log.created_at_ms.desc(), Log.id.desc()), page, page_size)
     
 
     return jsonifiedlog(logs)
\ No newline at end of file
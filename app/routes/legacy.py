@@ -1,9 +1,7 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import func
-from datetime import datetime, timedelta
 from app import db, limiter
 from app.models import Usuario, Devices, Log, Sync
-from app.utils import jsonifiedlog
+from app.utils import jsonifiedlog, parse_since_ms, days_cutoff_ms, device_logs, count_logs_by_device
 
 bp = Blueprint('legacy', __name__)
 
@@ -17,19 +15,20 @@ def old_debug_device_list():
     try:
         # Obtener dispositivos con información asociada
         devices = db.session.query(
+            Devices.id,
             Devices.udid,
-            Usuario.email,
-            func.count(Log.id).label('total_logs')
+            Usuario.email
         ).outerjoin(Sync, Sync.device_id == Devices.id
         ).outerjoin(Usuario, Usuario.id == Sync.user_id
-        ).outerjoin(Log, Log.device_id == Devices.id
-        ).group_by(Devices.udid, Usuario.email).all()
+        ).all()
+        # Los logs pueden estar repartidos en shards, se cuentan aparte
+        logs_count = count_logs_by_device()
 
         # Formatear respuesta
         response = [{
             'udid': device.udid,
             'registered_to': device.email,
-            'logs_count': device.total_logs
+            'logs_count': logs_count.get(device.id, 0)
         } for device in devices]
 
         return jsonify({'devices': response})
@@ -131,27 +130,26 @@ def old_get_specific_device_logs(udid):
     if not dispositivo:
         return jsonify({'error': 'Dispositivo no encontrado'}), 404
 
-    query = Log.query.filter_by(device_id=dispositivo.id)
+    query = device_logs(dispositivo.id)
 
     if days:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        query = query.filter(Log.created_at >= cutoff_date)
+        query = query.filter(Log.created_at_ms >= days_cutoff_ms(days))
     
     if since_str:
         try:
             # Parseamos la fecha CON segundos (formato: YYYY-MM-DDTHH:MM:SS)
-            since_datetime = datetime.strptime(since_str, '%Y-%m-%dT%H:%M:%S')
-            # Filtramos registros >= al timestamp proporcionado (ignorando microsegundos en la comparación)
-            query = query.filter(Log.created_at >= since_datetime)
+            since_ms = parse_since_ms(since_str)
+            # Filtramos registros >= al timestamp proporcionado sobre la columna entera indexada
+            query = query.filter(Log.created_at_ms >= since_ms)
         except ValueError:
             return jsonify({'error': 'Formato de fecha inválido. Usa YYYY-MM-DDTHH:MM:SS'}), 400
 
     if latest and latest.lower() == 'true':
-        logs = query.order_by(Log.created_at.desc()).limit(1).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(1).all()
     elif amount:
-        logs = query.order_by(Log.created_at.desc()).limit(amount).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(amount).all()
     else:
-        logs = query.order_by(Log.created_at.desc()).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
 
     return jsonify([{
         'temp': log.temp,
@@ -183,18 +181,17 @@ def old_get_user_device_logs(email, udid):
     if not Sync.query.filter_by(user_id=usuario.id, device_id=dispositivo.id).first():
         return jsonify({'error': 'Dispositivo no asociado al usuario'}), 403
 
-    query = Log.query.filter_by(device_id=dispositivo.id)
+    query = device_logs(dispositivo.id)
 
     if days:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        query = query.filter(Log.created_at >= cutoff_date)
+        query = query.filter(Log.created_at_ms >= days_cutoff_ms(days))
     
     if latest and latest.lower() == 'true':
-        logs = query.order_by(Log.created_at.desc()).limit(1).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(1).all()
     elif amount:
-        logs = query.order_by(Log.created_at.desc()).limit(amount).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).limit(amount).all()
     else:
-        logs = query.order_by(Log.created_at.desc()).all()
+        logs = query.order_by(Log.created_at_ms.desc(), Log.id.desc()).all()
 
     return jsonify([{
         'temp': log.temp,
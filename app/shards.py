@@ -0,0 +1,205 @@
+import zlib
+import click
+from flask import g
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, delete, event, func, insert, inspect, literal, select, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Log, DeviceStats, Alert
+
+# Tablas por dispositivo que viven en el shard (el resto queda en la base principal)
+SHARDED_TABLES = (Log, DeviceStats, Alert)
+
+class ShardRouter:
+    # Enruta los logs, estadisticas y alertas a N archivos SQLite segun un hash de device_id.
+    # Con LOG_SHARDS = 0 todo sigue en la base principal (db.session).
+    #
+    # Con shards activos:
+    # - Los ids de Log y Alert solo son unicos dentro de cada shard; identificar un
+    #   registro requiere (device_id, id). Los logs movidos con shard-logs conservan su id.
+    # - No hay relacion ORM Devices <-> Log (leeria la base principal); usar device_logs().
+    # - Las claves foraneas a devices no se validan dentro de los shards.
+    # - Alembic solo migra la base principal. El esquema de los shards se actualiza con
+    #   upgrade() (al arrancar y con flask shard-upgrade), que solo agrega tablas, columnas
+    #   e indices nuevos; renombrar, borrar o cambiar tipos requiere migrar cada shard a mano.
+
+    def __init__(self):
+        self.engines = []
+
+    def init_app(self, app):
+        count = app.config.get('LOG_SHARDS', 0)
+        uri = app.config.get('LOG_SHARD_URI')
+        self.engines = [create_engine(uri.format(i)) for i in range(count)]
+        for engine in self.engines:
+            event.listen(engine, 'connect', _sqlite_pragmas)
+        app.teardown_appcontext(self._close_sessions)
+
+    @property
+    def enabled(self):
+        return bool(self.engines)
+
+    def indexes(self):
+        return range(len(self.engines)) if self.enabled else range(1)
+
+    def shard_for(self, device_id):
+        if not self.enabled:
+            return 0
+        # crc32 es estable entre procesos, a diferencia de hash() con strings
+        return zlib.crc32(str(device_id).encode()) % len(self.engines)
+
+    def session(self, index):
+        if not self.enabled:
+            return db.session
+        sessions = g.setdefault('log_shard_sessions', {})
+        if index not in sessions:
+            sessions[index] = Session(bind=self.engines[index])
+        return sessions[index]
+
+    def session_for(self, device_id):
+        return self.session(self.shard_for(device_id))
+
+    def all_sessions(self):
+        return [self.session(i) for i in self.indexes()]
+
+    def rollback(self):
+        for session in g.get('log_shard_sessions', {}).values():
+            session.rollback()
+
+    def create_all(self):
+        for engine in self.engines:
+            for model in SHARDED_TABLES:
+                model.__table__.create(engine, checkfirst=True)
+        return self.upgrade()
+
+    def upgrade(self):
+        # Agrega a cada shard las columnas e indices del modelo que le falten
+        added = []
+        for index, engine in enumerate(self.engines):
+            for model in SHARDED_TABLES:
+                table = model.__table__
+                existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+                with engine.begin() as conn:
+                    for column in table.columns:
+                        if column.name not in existing:
+                            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect)}'))
+                            added.append(f'shard {index}: {table.name}.{column.name}')
+                for table_index in table.indexes:
+                    table_index.create(engine, checkfirst=True)
+        return added
+
+    def _close_sessions(self, exc=None):
+        for session in g.pop('log_shard_sessions', {}).values():
+            session.close()
+
+def _column_ddl(column, dialect):
+    ddl = f'{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        valor = literal(default, column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        ddl += f' DEFAULT {valor}'
+    if not column.nullable:
+        if default is None:
+            raise RuntimeError(f'No se puede agregar {column.table.name}.{column.name} NOT NULL sin default')
+        ddl += ' NOT NULL'
+    return ddl
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: lectores no bloquean al escritor de cada shard
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+log_shards = ShardRouter()
+
+def _move_table(model, batch_size):
+    table = model.__table__
+    key = table.primary_key.columns.values()[0]
+    columns = [column.name for column in table.columns]
+    moved = 0
+    while True:
+        rows = db.session.execute(select(table).order_by(key).limit(batch_size)).mappings().all()
+        if not rows:
+            return moved
+
+        por_shard = {}
+        for row in rows:
+            por_shard.setdefault(log_shards.shard_for(row['device_id']), []).append({c: row[c] for c in columns})
+
+        # Se conservan las claves. Una clave ya presente en el shard solo se acepta si la
+        # fila es identica (lote repetido tras una interrupcion); si no, es un conflicto
+        # real y la fila queda en la base principal.
+        copiadas, conflictos = [], []
+        for index, values in por_shard.items():
+            session = log_shards.session(index)
+            claves = [value[key.name] for value in values]
+            existentes = {
+                row[key.name]: dict(row)
+                for row in session.execute(select(table).where(key.in_(claves))).mappings()
+            }
+            nuevas = [value for value in values if value[key.name] not in existentes]
+            if nuevas:
+                session.execute(insert(table), nuevas)
+            session.commit()
+
+            for value in values:
+                actual = existentes.get(value[key.name])
+                (copiadas if actual is None or actual == value else conflictos).append(value[key.name])
+
+        if copiadas:
+            db.session.execute(delete(table).where(key.in_(copiadas)))
+            db.session.commit()
+        moved += len(copiadas)
+        click.echo(f'{table.name}: {moved} filas movidas')
+
+        if conflictos:
+            raise click.ClickException(
+                f'{table.name}: {len(conflictos)} filas chocan con datos distintos ya presentes en los shards '
+                f'({key.name} {conflictos[:10]}); quedan en la base principal'
+            )
+
+def _shards_with_data():
+    ocupados = []
+    for index in log_shards.indexes():
+        session = log_shards.session(index)
+        for model in SHARDED_TABLES:
+            if session.execute(select(func.count()).select_from(model.__table__)).scalar():
+                ocupados.append(f'shard {index}: {model.__tablename__}')
+    return ocupados
+
+@click.command('shard-logs')
+@click.option('--batch-size', type=click.IntRange(1, 50000), default=5000, show_default=True)
+@click.option('--resume', is_flag=True, help='Continuar una migracion interrumpida')
+@with_appcontext
+def shard_logs_command(batch_size, resume):
+    """Mueve logs, estadisticas y alertas de la base principal a sus shards.
+
+    La ingesta debe estar detenida mientras corre.
+    """
+    if not log_shards.enabled:
+        raise click.ClickException('LOG_SHARDS no esta configurado')
+
+    log_shards.create_all()
+    # Si los shards ya recibieron datos, los ids historicos chocarian con los nuevos
+    ocupados = _shards_with_data()
+    if ocupados and not resume:
+        raise click.ClickException(
+            'Los shards ya tienen datos (' + ', '.join(ocupados) + '). Ejecutar shard-logs con la '
+            'ingesta detenida y antes de recibir datos con LOG_SHARDS; --resume solo para continuar '
+            'una migracion interrumpida'
+        )
+
+    for model in SHARDED_TABLES:
+        _move_table(model, batch_size)
+
+@click.command('shard-upgrade')
+@with_appcontext
+def shard_upgrade_command():
+    """Agrega a los shards las tablas, columnas e indices nuevos del modelo."""
+    if not log_shards.enabled:
+        raise click.ClickException('LOG_SHARDS no esta configurado')
+
+    added = log_shards.create_all()
+    for column in added:
+        click.echo(f'Agregada {column}')
+    click.echo(f'{len(added)} columnas agregadas')
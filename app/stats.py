@@ -0,0 +1,134 @@
+import json
+import math
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from app.models import DeviceStats, Alert
+
+BUCKET_MS = 3_600_000
+WINDOW_BUCKETS = 24
+MAX_RETRIES = 3
+
+class DeviceState:
+    __slots__ = ('samples', 'last_ms', 'ewma_moisture', 'ewma_temp', 'buckets',
+                 'below_since_ms', 'dry_alerted', 'spike_alerted')
+
+    def __init__(self, row=None):
+        self.samples = row.samples if row else 0
+        self.last_ms = row.last_ms if row else None
+        self.ewma_moisture = row.ewma_moisture if row else None
+        self.ewma_temp = row.ewma_temp if row else None
+        # Buckets horarios: [hora, min_moisture, max_moisture, min_temp, max_temp]
+        self.buckets = json.loads(row.buckets) if row and row.buckets else []
+        self.below_since_ms = row.below_since_ms if row else None
+        self.dry_alerted = row.dry_alerted if row else False
+        self.spike_alerted = row.spike_alerted if row else False
+
+    def columns(self):
+        return {
+            'samples': self.samples,
+            'last_ms': self.last_ms,
+            'ewma_moisture': self.ewma_moisture,
+            'ewma_temp': self.ewma_temp,
+            'buckets': json.dumps(self.buckets),
+            'below_since_ms': self.below_since_ms,
+            'dry_alerted': self.dry_alerted,
+            'spike_alerted': self.spike_alerted
+        }
+
+    def rolling(self, now_ms):
+        desde = now_ms // BUCKET_MS - WINDOW_BUCKETS
+        vigentes = [b for b in self.buckets if b[0] > desde]
+        if not vigentes:
+            return None
+        return {
+            'moisture_dirt': {'min': min(b[1] for b in vigentes), 'max': max(b[2] for b in vigentes)},
+            'temp': {'min': min(b[3] for b in vigentes), 'max': max(b[4] for b in vigentes)}
+        }
+
+def get_state(session, device_id):
+    # Lectura por clave primaria; nunca recorre la tabla logs
+    return DeviceState(session.get(DeviceStats, device_id, populate_existing=True))
+
+def _ewma(prev, value, dt_ms, tau_ms):
+    if prev is None:
+        return value
+    # Factor dependiente del intervalo para muestras irregulares
+    alpha = 1.0 - math.exp(-max(dt_ms, 0) / tau_ms)
+    return prev + alpha * (value - prev)
+
+def _update_buckets(buckets, now_ms, moisture, temp):
+    hora = now_ms // BUCKET_MS
+    if buckets and buckets[-1][0] == hora:
+        b = buckets[-1]
+        b[1], b[2] = min(b[1], moisture), max(b[2], moisture)
+        b[3], b[4] = min(b[3], temp), max(b[4], temp)
+    else:
+        buckets.append([hora, moisture, moisture, temp, temp])
+
+    while buckets[0][0] <= hora - WINDOW_BUCKETS:
+        buckets.pop(0)
+
+def _apply_reading(state, device_id, moisture, temp, now_ms):
+    config = current_app.config
+    alerts = []
+
+    # Pico de temperatura respecto a la media previa (una alerta por episodio)
+    if state.ewma_temp is not None and abs(temp - state.ewma_temp) >= config['ALERT_TEMP_SPIKE_DELTA']:
+        if not state.spike_alerted:
+            alerts.append(Alert(device_id=device_id, rule='temp_spike', value=temp, created_at_ms=now_ms))
+            state.spike_alerted = True
+    else:
+        state.spike_alerted = False
+
+    dt_ms = now_ms - state.last_ms if state.last_ms is not None else 0
+    tau_ms = config['STATS_EWMA_MINUTES'] * 60_000
+    state.ewma_moisture = _ewma(state.ewma_moisture, moisture, dt_ms, tau_ms)
+    state.ewma_temp = _ewma(state.ewma_temp, temp, dt_ms, tau_ms)
+    _update_buckets(state.buckets, now_ms, moisture, temp)
+
+    # Humedad por debajo del umbral de forma sostenida (una alerta por episodio)
+    if moisture < config['ALERT_MOISTURE_THRESHOLD']:
+        if state.below_since_ms is None:
+            state.below_since_ms = now_ms
+        if not state.dry_alerted and now_ms - state.below_since_ms >= config['ALERT_MOISTURE_MINUTES'] * 60_000:
+            alerts.append(Alert(device_id=device_id, rule='low_moisture', value=moisture, created_at_ms=now_ms))
+            state.dry_alerted = True
+    else:
+        state.below_since_ms = None
+        state.dry_alerted = False
+
+    state.samples += 1
+    state.last_ms = now_ms
+    return alerts
+
+def update_device_stats(session, device_id, moisture, temp, now_ms):
+    # Actualiza el estado en O(1) y evalua las reglas de alerta; no consulta la tabla logs.
+    # La escritura solo procede si samples no cambio desde la lectura; si otro proceso
+    # escribio antes, se relee la fila y se reintenta. Se usa la sesion del shard del
+    # dispositivo, asi estado, alertas y log se confirman juntos.
+    for _ in range(MAX_RETRIES):
+        row = session.get(DeviceStats, device_id, populate_existing=True)
+        state = DeviceState(row)
+        alerts = _apply_reading(state, device_id, moisture, temp, now_ms)
+
+        if row is None:
+            try:
+                with session.begin_nested():
+                    session.add(DeviceStats(device_id=device_id, **state.columns()))
+            except IntegrityError:
+                continue
+        else:
+            result = session.execute(
+                update(DeviceStats)
+                .where(DeviceStats.device_id == device_id, DeviceStats.samples == row.samples)
+                .values(**state.columns())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                continue
+
+        session.add_all(alerts)
+        return alerts
+
+    raise RuntimeError('Conflicto concurrente al actualizar las estadisticas del dispositivo')
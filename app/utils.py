@@ -1,8 +1,12 @@
 from flask import jsonify
-from app.models import Log
+from datetime import datetime
+from sqlalchemy import and_, func, or_, select
+from app.models import Log, get_epoch_ms, pacific_to_epoch_ms
+from app.shards import log_shards
 
 def jsonifiedlog(logs):
     return jsonify([{
+        'id': log.id,
         'temp': log.temp,
         'moisture_dirt': log.moisture_dirt,
         'moisture_air': log.moisture_air,
@@ -10,5 +14,70 @@ def jsonifiedlog(logs):
         'raw_calMin': log.raw_calMin,
         'raw_calMax': log.raw_calMax,
         'soil_type': log.soil_type,
-        'timestamp': log.created_at.isoformat()
-    } for log in logs])
\ No newline at end of file
+        'timestamp': log.created_at.isoformat(),
+        'timestamp_ms': log.created_at_ms
+    } for log in logs])
+
+def device_logs(device_id):
+    # Consulta de logs de un dispositivo en su shard (o en la base principal)
+    return log_shards.session_for(device_id).query(Log).filter(Log.device_id == device_id)
+
+def paginate_logs(query, page, page_size):
+    page = max(page, 1)
+    page_size = page_size if page_size > 0 else 10
+    return query.offset((page - 1) * page_size).limit(page_size).all()
+
+def count_logs_by_device():
+    # Conteo por dispositivo sumando todos los shards
+    counts = {}
+    for session in log_shards.all_sessions():
+        rows = session.execute(select(Log.device_id, func.count(Log.id)).group_by(Log.device_id))
+        for device_id, total in rows:
+            counts[device_id] = counts.get(device_id, 0) + total
+    return counts
+
+def before_cursor(before_ms, before_id=None):
+    # Cursor compuesto (created_at_ms, id): desempata registros del mismo milisegundo
+    if before_id is None:
+        return Log.created_at_ms < before_ms
+    return or_(Log.created_at_ms < before_ms, and_(Log.created_at_ms == before_ms, Log.id < before_id))
+
+def parse_since_ms(since_str):
+    # Fecha CON segundos (formato: YYYY-MM-DDTHH:MM:SS) en hora del Pacifico -> epoch UTC en ms
+    return pacific_to_epoch_ms(datetime.strptime(since_str, '%Y-%m-%dT%H:%M:%S'))
+
+def days_cutoff_ms(days):
+    return get_epoch_ms() - days * 86_400_000
+
+def jsonifiedjob(job):
+    return jsonify({
+        'job_id': job.id,
+        'udid': job.device.udid if job.device else None,
+        'soil_type': job.soil_type,
+        'cal_min': job.cal_min,
+        'cal_max': job.cal_max,
+        'gamma': job.gamma,
+        'status': job.status,
+        'processed': job.processed,
+        'shard': job.shard,
+        'last_log_id': job.last_log_id
+    })
+
+def jsonifiedstats(udid, state, alerts):
+    now_ms = get_epoch_ms()
+    return jsonify({
+        'udid': udid,
+        'samples': state.samples,
+        'last_timestamp_ms': state.last_ms,
+        'ewma': {
+            'moisture_dirt': state.ewma_moisture,
+            'temp': state.ewma_temp
+        },
+        'rolling_24h': state.rolling(now_ms),
+        'below_threshold_ms': now_ms - state.below_since_ms if state.below_since_ms is not None else 0,
+        'alerts': [{
+            'rule': alert.rule,
+            'value': alert.value,
+            'timestamp_ms': alert.created_at_ms
+        } for alert in alerts]
+    })
@@ -0,0 +1,80 @@
+"""added created_at_ms epoch column
+
+Revision ID: 4b7e2a9c1d3f
+Revises: dfdc4d65256a
+Create Date: 2026-10-19 10:12:41.208314
+
+"""
+from datetime import datetime, timedelta, timezone
+import os
+import time
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2a9c1d3f'
+down_revision = 'dfdc4d65256a'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# El created_at historico se escribia como UTC - 7 h si el servidor estaba en horario
+# de verano (time.localtime().tm_isdst) y UTC - 8 h si no; no es hora real del Pacifico.
+# Por defecto se reproduce esa regla con el horario local de la maquina que corre la
+# migracion (debe tener la misma TZ que el servidor que escribio los datos; en un host
+# UTC tm_isdst siempre es 0 y todo queda en UTC - 8). LEGACY_UTC_OFFSET_HOURS=8 (o 7)
+# fuerza un desfase fijo.
+LEGACY_OFFSET = os.environ.get('LEGACY_UTC_OFFSET_HOURS')
+
+
+def _legacy_offset(stored):
+    if LEGACY_OFFSET is not None:
+        return timedelta(hours=float(LEGACY_OFFSET))
+    # Se busca el desfase coherente con el tm_isdst que tenia el servidor en ese instante
+    for hours in (8, 7):
+        utc = stored + timedelta(hours=hours)
+        is_dst = time.localtime(utc.replace(tzinfo=timezone.utc).timestamp()).tm_isdst > 0
+        if is_dst == (hours == 7):
+            return timedelta(hours=hours)
+    return timedelta(hours=8)
+
+
+def _to_epoch_ms(value):
+    # SQLite devuelve created_at como texto
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    utc = value + _legacy_offset(value)
+    return int(utc.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def upgrade():
+    with op.batch_alter_table('logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at_ms', sa.BigInteger(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_logs_created_at_ms'), ['created_at_ms'], unique=False)
+        batch_op.create_index('ix_logs_device_id_created_at_ms', ['device_id', 'created_at_ms'], unique=False)
+
+    # Backfill por lotes de id para no cargar toda la tabla en memoria
+    conn = op.get_bind()
+    select_batch = sa.text(
+        'SELECT id, created_at FROM logs '
+        'WHERE id > :last_id AND created_at_ms IS NULL AND created_at IS NOT NULL '
+        'ORDER BY id LIMIT :limit'
+    )
+    update_row = sa.text('UPDATE logs SET created_at_ms = :ms WHERE id = :id')
+
+    last_id = 0
+    while True:
+        rows = conn.execute(select_batch, {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(update_row, [{'id': row.id, 'ms': _to_epoch_ms(row.created_at)} for row in rows])
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_logs_device_id_created_at_ms')
+        batch_op.drop_index(batch_op.f('ix_logs_created_at_ms'))
+        batch_op.drop_column('created_at_ms')